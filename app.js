@@ -32,7 +32,74 @@ function generateRandomTestData(numSamples = 3) {
     return testData;
 }
 
-// Function to predict from models by calling Python script
+// Persistent Python worker so the interpreter and models are loaded only once
+let predictionWorker = null;
+
+function rejectPendingRequests(worker, error) {
+    worker.pendingRequests.splice(0).forEach(request => request.reject(error));
+}
+
+function getPredictionWorker() {
+    if (predictionWorker) {
+        return predictionWorker;
+    }
+
+    // Create options for python-shell
+    let options = {
+        mode: 'text',
+        pythonOptions: ['-u'], // get print results in real-time
+        scriptPath: path.join(__dirname),
+        args: ['--worker']
+    };
+
+    const worker = new PythonShell('predict.py', options);
+    // Each worker has its own queue, so a worker that is shutting down
+    // never answers or rejects requests sent to its replacement
+    worker.pendingRequests = [];
+
+    // The worker answers requests in the order they were sent
+    worker.on('message', (message) => {
+        const request = worker.pendingRequests.shift();
+        if (!request) {
+            return;
+        }
+        try {
+            // Parse the returned JSON message
+            request.resolve(JSON.parse(message));
+        } catch (error) {
+            request.reject(`Error parsing prediction result: ${error}`);
+        }
+    });
+
+    worker.on('stderr', (stderr) => {
+        console.error('Python error:', stderr);
+    });
+
+    worker.on('error', (err) => {
+        rejectPendingRequests(worker, err);
+    });
+
+    worker.on('close', () => {
+        if (predictionWorker === worker) {
+            predictionWorker = null;
+        }
+        rejectPendingRequests(worker, new Error('Prediction worker exited'));
+    });
+
+    predictionWorker = worker;
+    return worker;
+}
+
+// Stop the Python worker; the next prediction starts a new one
+function closePredictionWorker() {
+    if (predictionWorker) {
+        const worker = predictionWorker;
+        predictionWorker = null;
+        worker.end(() => {});
+    }
+}
+
+// Function to predict from models by sending a request to the Python worker
 function predictFromModels(inputDataArray) {
     return new Promise((resolve, reject) => {
         // Validate input array length
@@ -50,39 +117,10 @@ function predictFromModels(inputDataArray) {
             return;
         }
 
-        // Create options for python-shell
-        let options = {
-            mode: 'text',
-            pythonOptions: ['-u'], // get print results in real-time
-            scriptPath: path.join(__dirname),
-            args: []
-        };
-        
-        // Run Python script and pass the inputData as JSON string
-        let pyShell = new PythonShell('predict.py', options);
-        pyShell.send(JSON.stringify(inputDataArray));
-        
-        pyShell.on('message', (message) => {
-            try {
-                // Parse the returned JSON message
-                let result = JSON.parse(message);
-                resolve(result);
-            } catch (error) {
-                reject(`Error parsing prediction result: ${error}`);
-            }
-        });
-
-        pyShell.on('stderr', (stderr) => {
-            console.error('Python error:', stderr);
-        });
-
-        pyShell.on('error', (err) => {
-            reject(err);
-        });
-
-        pyShell.end((err) => {
-            if (err) reject(err);
-        });
+        // Send the inputData as a single line of JSON
+        const worker = getPredictionWorker();
+        worker.pendingRequests.push({ resolve, reject });
+        worker.send(JSON.stringify(inputDataArray));
     });
 }
 
@@ -103,4 +141,5 @@ predictFromModels(inputDataArray)
     })
     .catch(error => {
         console.error("Error:", error);
-    });
+    })
+    .finally(closePredictionWorker);
@@ -0,0 +1,25 @@
+import sys
+import joblib
+from skl2onnx import convert_sklearn
+from skl2onnx.common.data_types import FloatTensorType
+
+# Convert each model to ONNX once, offline; predict.py picks up the .onnx files
+# and runs them with onnxruntime when it is installed
+model_names = sys.argv[1:] or [
+    'temperature_model',
+    'vibration_model',
+    'magnetic_flux_model',
+    'audible_sound_model',
+    'ultra_sound_model'
+]
+
+for name in model_names:
+    model = joblib.load(f"{name}.pkl")
+    onnx_model = convert_sklearn(
+        model,
+        initial_types=[('X', FloatTensorType([None, model.n_features_in_]))],
+        options={id(model): {'zipmap': False}}
+    )
+    with open(f"{name}.onnx", "wb") as f:
+        f.write(onnx_model.SerializeToString())
+    print(f"Wrote {name}.onnx")
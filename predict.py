@@ -1,10 +1,12 @@
+import operator
+import os
 import sys
 import joblib
-import json
+import orjson
 import numpy as np
 import pandas as pd
-from collections import Counter
 from datetime import datetime
+from joblib import Parallel, delayed
 
 # Load the models
 model_names = [
@@ -14,7 +16,51 @@ model_names = [
     'audible_sound_model',
     'ultra_sound_model'
 ]
-models = {name: joblib.load(f"{name}.pkl") for name in model_names}
+
+def onnx_is_current(name):
+    """
+    True if name.onnx exists and was written after name.pkl. A pickle retrained
+    since the last convert_to_onnx.py run makes its ONNX file stale.
+    """
+    onnx_path = f"{name}.onnx"
+    if not os.path.exists(onnx_path):
+        return False
+    if os.path.getmtime(onnx_path) < os.path.getmtime(f"{name}.pkl"):
+        print(f"Ignoring stale {onnx_path}; re-run convert_to_onnx.py", file=sys.stderr)
+        return False
+    return True
+
+# Use ONNX Runtime for every model with an up-to-date conversion from convert_to_onnx.py;
+# onnxruntime is optional and only imported when there is something for it to run
+onnx_model_names = [name for name in model_names if onnx_is_current(name)]
+sessions = {}
+if onnx_model_names:
+    try:
+        import onnxruntime as ort
+    except ImportError:
+        onnx_model_names = []
+if onnx_model_names:
+    # The five sessions already run concurrently, so each one gets a single intra-op thread
+    session_options = ort.SessionOptions()
+    session_options.intra_op_num_threads = 1
+    sessions = {
+        name: ort.InferenceSession(f"{name}.onnx", session_options, providers=['CPUExecutionProvider'])
+        for name in onnx_model_names
+    }
+
+# Only unpickle the models that are not served by ONNX Runtime
+models = {name: joblib.load(f"{name}.pkl") for name in model_names if name not in sessions}
+
+def is_numeric_model(name):
+    """
+    Classifiers get a majority vote; everything else is averaged. A converted
+    classifier's first output is its label tensor (string or int64), a regressor's is float.
+    """
+    if name in sessions:
+        return sessions[name].get_outputs()[0].type in ('tensor(float)', 'tensor(double)')
+    return not hasattr(models[name], 'classes_')
+
+MODEL_IS_NUMERIC = {name: is_numeric_model(name) for name in model_names}
 
 # Define the feature sets used by each model
 feature_sets = {
@@ -25,148 +71,289 @@ feature_sets = {
     'ultra_sound_model': ['vibration_x', 'vibration_y', 'vibration_z', 'ultra_sound']
 }
 
-def evaluate_machine_condition(temperature, vibration):
-    if temperature < 80 and vibration < 1.8:
-        return "Safe Condition"
-    elif temperature < 100 and vibration < 2.8:
-        return "Maintain Condition"
-    else:
-        return "Repair Condition"
-
-def detect_temperature_anomaly(temperature):
-    if temperature < 80:
-        return "No significant temperature anomaly detected"
-    elif 80 <= temperature < 100:
-        return "Moderate Overheating - Check Lubrication"
-    elif 100 <= temperature < 120:
-        return "Significant Overheating - Possible Misalignment or Bearing Wear"
-    else:
-        return "Critical Overheating - Immediate Repair Needed"
-
-def detect_vibration_anomaly(vibration):
-    if vibration < 1.8:
-        return "No significant vibration anomaly detected"
-    elif 1.8 <= vibration < 2.8:
-        return "Unbalance Fault"
-    elif 2.8 <= vibration < 4.5:
-        return "Misalignment Fault"
-    elif 4.5 <= vibration < 7.1:
-        return "Looseness Fault"
-    else:
-        return "Bearing Fault or Gear Mesh Fault"
-
-def analyze_health(input_data):
-    # Calculate average temperature and vibration
-    avg_temp = (float(input_data['temperature_one']) + float(input_data['temperature_two'])) / 2
-    avg_vibration = (float(input_data['vibration_x']) + float(input_data['vibration_y']) + float(input_data['vibration_z'])) / 3
-    
-    condition = evaluate_machine_condition(avg_temp, avg_vibration)
-    
-    # Determine overall health status
-    overall_health = "Healthy" if condition == "Safe Condition" else "Unhealthy"
-    
-    return {
-        "complete_analysis": {
-            "machine_condition": condition,
-            "temperature_analysis": detect_temperature_anomaly(avg_temp),
-            "vibration_analysis": detect_vibration_anomaly(avg_vibration),
-            "timestamp": datetime.now().isoformat()
-        },
-        "overall_health": overall_health
-    }
+# Canonical column order of the batch feature matrix, and where each model's features live in it
+ALL_FEATURES = [
+    'temperature_one', 'temperature_two',
+    'vibration_x', 'vibration_y', 'vibration_z',
+    'magnetic_flux_x', 'magnetic_flux_y', 'magnetic_flux_z',
+    'audible_sound', 'ultra_sound'
+]
+col_idx = {
+    model_name: np.array([ALL_FEATURES.index(feature) for feature in features])
+    for model_name, features in feature_sets.items()
+}
+
+# Pulls every feature of a row, in ALL_FEATURES order, in one C call
+FEATURE_GETTER = operator.itemgetter(*ALL_FEATURES)
+
+# Sensor columns averaged by the health analysis
+TEMPERATURE_COLS = np.array([ALL_FEATURES.index(feature) for feature in ['temperature_one', 'temperature_two']])
+VIBRATION_COLS = np.array([ALL_FEATURES.index(feature) for feature in ['vibration_x', 'vibration_y', 'vibration_z']])
 
-def aggregate_predictions(predictions_list):
+# Output key of each model, and everything the hot loops need per model in one tuple
+OUT_KEY = {model_name: model_name.replace('_model', '') for model_name in model_names}
+MODEL_ITEMS = [
+    (model_name, OUT_KEY[model_name], feature_sets[model_name], models.get(model_name))
+    for model_name in model_names
+]
+
+# Labels for the machine condition and the temperature and vibration anomaly classes
+CONDITION_LABELS = np.array(["Safe Condition", "Maintain Condition", "Repair Condition"])
+TEMPERATURE_LABELS = np.array([
+    "No significant temperature anomaly detected",
+    "Moderate Overheating - Check Lubrication",
+    "Significant Overheating - Possible Misalignment or Bearing Wear",
+    "Critical Overheating - Immediate Repair Needed"
+])
+VIBRATION_LABELS = np.array([
+    "No significant vibration anomaly detected",
+    "Unbalance Fault",
+    "Misalignment Fault",
+    "Looseness Fault",
+    "Bearing Fault or Gear Mesh Fault"
+])
+
+# Bin edges between the temperature and vibration anomaly classes
+TEMPERATURE_BINS = [80, 100, 120]
+VIBRATION_BINS = [1.8, 2.8, 4.5, 7.1]
+
+def analyze_health_batch(X):
+    """
+    Classify the health of every row of the feature matrix X.
+    Returns one analysis dict per row.
+    """
+    # Calculate average temperature and vibration for all rows, one reduction each
+    temps = X[:, TEMPERATURE_COLS].mean(axis=1)
+    vibs = X[:, VIBRATION_COLS].mean(axis=1)
+    
+    temperature_analysis = TEMPERATURE_LABELS[np.digitize(temps, TEMPERATURE_BINS)]
+    vibration_analysis = VIBRATION_LABELS[np.digitize(vibs, VIBRATION_BINS)]
+    
+    safe = (temps < 80) & (vibs < 1.8)
+    maintain = (temps < 100) & (vibs < 2.8)
+    conditions = CONDITION_LABELS[np.select([safe, maintain], [0, 1], default=2)]
+    
+    timestamp = datetime.now().isoformat()
+    return [
+        {
+            "machine_condition": str(condition),
+            "temperature_analysis": str(temperature),
+            "vibration_analysis": str(vibration),
+            "timestamp": timestamp
+        }
+        for condition, temperature, vibration in zip(conditions, temperature_analysis, vibration_analysis)
+    ]
+
+# A vote winner needs at least this share of the votes, otherwise the result is UNCERTAIN
+MIN_VOTE_SHARE = 0.5
+UNCERTAIN = "Uncertain"
+
+# Ties between labels go to the most severe one; unknown labels rank below all of these
+LABEL_SEVERITY = {'healthy': 0, 'warning': 1, 'unhealthy': 2}
+
+def severity_order(labels):
+    """
+    Indices of labels from most to least severe, keeping sorted order among equals.
+    """
+    return np.argsort([-LABEL_SEVERITY.get(str(label), -1) for label in labels], kind='stable')
+
+def majority_vote(votes):
+    """
+    Majority vote over an array of labels. Ties go to the most severe
+    label, and a winner below MIN_VOTE_SHARE of the votes gives UNCERTAIN.
+    """
+    labels, codes = np.unique(votes, return_inverse=True)
+    counts = np.bincount(codes.ravel(), minlength=len(labels))
+    # argmax returns the first maximum, so scan the counts from most to least severe
+    order = severity_order(labels)
+    winner = order[counts[order].argmax()]
+    if counts[winner] < MIN_VOTE_SHARE * codes.size:
+        return UNCERTAIN
+    return str(labels[winner])
+
+def row_first_vote(predictions_by_model):
+    """
+    Combine the categorical models with row-first voting: each row first
+    votes across models, then the row winners vote across the batch.
+    Returns None when no model is categorical.
+    """
+    categorical = [predictions_by_model[model_name] for model_name, _, _, _ in MODEL_ITEMS if not MODEL_IS_NUMERIC[model_name]]
+    if not categorical:
+        return None
+    
+    # (N, models) label matrix, integer-encoded once
+    L = np.column_stack(categorical)
+    labels, codes = np.unique(L.ravel(), return_inverse=True)
+    codes = codes.reshape(L.shape)
+    
+    # Per-row vote counts for every label, then the winning label of each row;
+    # the label axis is scanned from most to least severe so ties go to the most severe
+    row_counts = (codes[:, :, np.newaxis] == np.arange(len(labels))).sum(axis=1)
+    order = severity_order(labels)
+    row_winners = order[row_counts[:, order].argmax(axis=1)]
+    
+    return majority_vote(labels[row_winners])
+
+def overall_health(aggregated):
+    """
+    A batch is healthy only if no per-model prediction is unhealthy or UNCERTAIN.
+    The ensemble vote is left out on purpose: it only combines the per-model
+    predictions, so it must not override them.
+    """
+    per_model = (aggregated[key] for key in OUT_KEY.values())
+    return "Unhealthy" if any(value in ("unhealthy", UNCERTAIN) for value in per_model) else "Healthy"
+
+def aggregate_predictions(predictions_by_model):
     """
     Aggregate multiple predictions into a single result using majority voting for
     categorical predictions and mean for numerical predictions.
     """
     aggregated = {}
     
-    # Get all predictions for each model
-    for model_name in model_names:
-        key = model_name.replace('_model', '')
-        model_predictions = [pred[key] for pred in predictions_list]
+    # Each model's predictions for the whole batch are already in one array
+    for model_name, key, _, _ in MODEL_ITEMS:
+        model_predictions = predictions_by_model[model_name]
         
-        # Check if predictions are numerical or categorical
-        if all(isinstance(x, (int, float)) for x in model_predictions):
+        # Numerical or categorical is fixed per model, so it is decided once at load time
+        if MODEL_IS_NUMERIC[model_name]:
             # For numerical predictions, use mean
-            aggregated[key] = float(np.mean(model_predictions))
+            aggregated[key] = model_predictions.astype(np.float64).mean()
         else:
             # For categorical predictions, use majority vote
-            most_common = Counter(model_predictions).most_common(1)[0][0]
-            aggregated[key] = str(most_common)
+            aggregated[key] = majority_vote(model_predictions)
+    
+    ensemble = row_first_vote(predictions_by_model)
+    if ensemble is not None:
+        aggregated['ensemble'] = ensemble
     
     return aggregated
 
+def predict_batch(model_name, model, features, X):
+    try:
+        session = sessions.get(model_name)
+        if session is not None:
+            # The first output of a converted model is the predicted label
+            return session.run(None, {'X': X})[0]
+        
+        # Wrap in a DataFrame to keep the feature names the models were fitted with
+        X_input_df = pd.DataFrame(X, columns=features)
+        return model.predict(X_input_df)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid input for {model_name}: {str(e)}")
+
+def build_feature_matrix(input_data_array):
+    """
+    Lay the input rows out as one (N, len(ALL_FEATURES)) float64 matrix.
+    Null or absent features become NaN.
+    """
+    try:
+        # Fast path when every row has every feature: numpy converts the whole batch
+        # of feature tuples in one call, turning nulls into NaN
+        return np.array(list(map(FEATURE_GETTER, input_data_array)), dtype=np.float64)
+    except KeyError:
+        pass
+    
+    # Some rows lack features; fill in whatever each row has
+    X = np.full((len(input_data_array), len(ALL_FEATURES)), np.nan)
+    _float = float
+    for i, input_data in enumerate(input_data_array):
+        get = input_data.get
+        for j, feature in enumerate(ALL_FEATURES):
+            value = get(feature)
+            if value is not None:
+                X[i, j] = _float(value)
+    return X
+
 def predict_from_models(input_data_array):
-    # Get individual predictions for each input
-    all_predictions = []
-    health_analysis = []
+    # Build the feature matrix once; every step below reads from it
+    try:
+        X = build_feature_matrix(input_data_array)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid input: {str(e)}")
     
-    for input_data in input_data_array:
-        predictions = {}
-        
-        for model_name in model_names:
-            features = feature_sets[model_name]
-            model = models[model_name]
-            
-            try:
-                # Convert input features to a dictionary and then to DataFrame for feature names
-                X_input = {feature: float(input_data[feature]) for feature in features}
-                X_input_df = pd.DataFrame([X_input])
-                
-                # Predict using DataFrame with feature names
-                prediction = model.predict(X_input_df)[0]
-                
-                # Handle both numeric and string predictions
-                if isinstance(prediction, (np.integer, np.floating)):
-                    prediction = float(prediction)
-                else:
-                    prediction = str(prediction)
-                    
-                predictions[model_name.replace('_model', '')] = prediction
-                
-            except (ValueError, TypeError) as e:
-                raise ValueError(f"Invalid input for {model_name}: {str(e)}")
-        
-        health_info = analyze_health(input_data)
-        all_predictions.append(predictions)
-        health_analysis.append(health_info['complete_analysis'])
+    # A single vectorized pass flags null, missing and non-finite values
+    valid_mask = np.isfinite(X)
+    
+    # Gather each model's columns with fancy indexing and reject incomplete rows
+    feature_matrices = {}
+    for model_name in model_names:
+        bad_rows = ~valid_mask[:, col_idx[model_name]].all(axis=1)
+        if bad_rows.any():
+            raise ValueError(
+                f"Invalid input for {model_name}: feature values cannot be null, missing or non-finite "
+                f"(row {np.flatnonzero(bad_rows)[0]})"
+            )
+        # Tree models compare features in float32 internally, so handing them float32
+        # gives identical predictions and skips sklearn's own conversion copy
+        feature_matrices[model_name] = X[:, col_idx[model_name]].astype(np.float32)
+    
+    # The models are independent, so run them concurrently; tree predict releases the GIL
+    results = Parallel(n_jobs=min(len(model_names), os.cpu_count() or 1), backend='threading')(
+        delayed(predict_batch)(model_name, model, features, feature_matrices[model_name])
+        for model_name, _, features, model in MODEL_ITEMS
+    )
+    predictions_by_model = dict(zip(model_names, results))
+    
+    health_analysis = analyze_health_batch(X)
     
     # Aggregate predictions
-    aggregated_predictions = aggregate_predictions(all_predictions)
+    aggregated_predictions = aggregate_predictions(predictions_by_model)
     
     # Add overall health to aggregated predictions
-    health_status = health_analysis[0]['machine_condition']
-    aggregated_predictions['overall_health'] = "Unhealthy" if "unhealthy" in list(aggregated_predictions.values()) else "Healthy"
+    aggregated_predictions['overall_health'] = overall_health(aggregated_predictions)
     
     result = {
         "predictions": aggregated_predictions,
+        "complete_health_analysis": health_analysis
     }
     
     return result
 
-# Receive JSON input
-input_json = sys.stdin.read()
-input_data_array = json.loads(input_json)
-
-# Validate input length
-if not isinstance(input_data_array, list):
-    print(json.dumps({"error": "Input must be an array"}))
-    sys.exit(1)
-if len(input_data_array) > 1800:
-    print(json.dumps({"error": "Input array exceeds maximum length of 1800"}))
-    sys.exit(1)
-if len(input_data_array) == 0:
-    print(json.dumps({"error": "Input array cannot be empty"}))
-    sys.exit(1)
-
-try:
-    # Generate prediction and health analysis
-    result = predict_from_models(input_data_array)
-    
-    # Output the result as JSON
-    print(json.dumps(result))
-except Exception as e:
-    print(json.dumps({"error": str(e)}))
-    sys.exit(1)
+def write_json(obj):
+    sys.stdout.buffer.write(orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE))
+    sys.stdout.flush()
+
+def handle(input_data_array):
+    """
+    Validate one request and run the prediction on it. Errors are
+    returned as {"error": ...} so a worker can keep serving requests.
+    """
+    # Validate input length
+    if not isinstance(input_data_array, list):
+        return {"error": "Input must be an array"}
+    if len(input_data_array) > 1800:
+        return {"error": "Input array exceeds maximum length of 1800"}
+    if len(input_data_array) == 0:
+        return {"error": "Input array cannot be empty"}
+    
+    try:
+        # Generate prediction and health analysis
+        return predict_from_models(input_data_array)
+    except Exception as e:
+        return {"error": str(e)}
+
+def main():
+    if '--worker' in sys.argv[1:]:
+        # Long-running mode: one JSON request per input line, one JSON response per output line,
+        # so the models are loaded once for the lifetime of the process
+        for line in sys.stdin.buffer:
+            if not line.strip():
+                continue
+            try:
+                request = orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                write_json({"error": f"Invalid JSON: {str(e)}"})
+                continue
+            write_json(handle(request))
+    else:
+        # Receive JSON input as raw bytes; orjson parses them without a separate decode step
+        input_data_array = orjson.loads(sys.stdin.buffer.read())
+        
+        # Output the result as JSON
+        result = handle(input_data_array)
+        write_json(result)
+        if "error" in result:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def predict():
+    # predict.py loads the .pkl models relative to the working directory
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    try:
+        import predict as module
+    finally:
+        os.chdir(cwd)
+    return module
+
+
+def labels(*counts):
+    """Build a label array from (label, count) pairs."""
+    return np.array([label for label, count in counts for _ in range(count)], dtype=object)
+
+
+def test_majority_vote_ties_go_to_the_most_severe_label(predict):
+    assert predict.majority_vote(labels(("unhealthy", 1), ("healthy", 1))) == "unhealthy"
+    assert predict.majority_vote(labels(("healthy", 2), ("warning", 2))) == "warning"
+
+
+def test_majority_vote_below_min_share_is_uncertain(predict):
+    votes = labels(("unhealthy", 8), ("warning", 7), ("healthy", 5))
+    assert predict.majority_vote(votes) == predict.UNCERTAIN
+
+
+def test_uncertain_prediction_makes_overall_health_unhealthy(predict):
+    healthy = labels(("healthy", 20))
+    predictions_by_model = {name: healthy for name in predict.model_names}
+    predictions_by_model["temperature_model"] = labels(("unhealthy", 8), ("warning", 7), ("healthy", 5))
+
+    aggregated = predict.aggregate_predictions(predictions_by_model)
+
+    assert aggregated["temperature"] == predict.UNCERTAIN
+    assert predict.overall_health(aggregated) == "Unhealthy"
+
+
+def test_all_healthy_predictions_make_overall_health_healthy(predict):
+    healthy = labels(("healthy", 20))
+    aggregated = predict.aggregate_predictions({name: healthy for name in predict.model_names})
+
+    assert predict.overall_health(aggregated) == "Healthy"
+
+
+def test_row_first_vote_ties_within_a_row_go_to_the_most_severe_label(predict):
+    # Every row splits 2 unhealthy / 2 healthy / 1 warning across the five models
+    row = ["unhealthy", "unhealthy", "healthy", "healthy", "warning"]
+    predictions_by_model = {name: np.array([label] * 3, dtype=object) for name, label in zip(predict.model_names, row)}
+
+    assert predict.row_first_vote(predictions_by_model) == "unhealthy"
+
+
+def test_ensemble_does_not_feed_overall_health(predict):
+    aggregated = {key: "healthy" for key in predict.OUT_KEY.values()}
+    aggregated["ensemble"] = predict.UNCERTAIN
+
+    assert predict.overall_health(aggregated) == "Healthy"
+
+
+def test_worker_answers_one_line_per_request_in_order():
+    row = {
+        "temperature_one": 90, "temperature_two": 85,
+        "vibration_x": 2.5, "vibration_y": 2.0, "vibration_z": 1.8,
+        "magnetic_flux_x": 0.9, "magnetic_flux_y": 1.0, "magnetic_flux_z": 1.1,
+        "audible_sound": 0.3, "ultra_sound": 0.2
+    }
+    requests = [
+        json.dumps([row]),
+        "",
+        "not json",
+        json.dumps([]),
+        json.dumps([dict(row, temperature_one=None)]),
+        json.dumps([row, row]),
+    ]
+
+    completed = subprocess.run(
+        [sys.executable, "predict.py", "--worker"],
+        input="\n".join(requests) + "\n",
+        capture_output=True, text=True, cwd=ROOT, timeout=120
+    )
+
+    assert completed.returncode == 0
+    responses = [json.loads(line) for line in completed.stdout.splitlines()]
+    # The blank line gets no response; every other line gets exactly one, in order
+    assert len(responses) == 5
+    assert "predictions" in responses[0]
+    assert responses[1]["error"].startswith("Invalid JSON")
+    assert responses[2] == {"error": "Input array cannot be empty"}
+    assert responses[3]["error"].startswith("Invalid input for temperature_model")
+    assert len(responses[4]["complete_health_analysis"]) == 2